@@ -1,25 +1,83 @@
 import os
-import json
+import re
+import pickle
+import hashlib
+import random
+import shutil
+import orjson
+import msgspec
+import asyncio
 import sqlite3
-import pandas as pd
+import threading
 from tqdm import tqdm
 from loguru import logger
-from datetime import datetime
+from datetime import datetime, timedelta
 from jobspy import scrape_jobs
-from collections import namedtuple
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from itertools import chain, zip_longest
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Set, Tuple
 from time import sleep
 from contextlib import contextmanager
+from functools import lru_cache
 from sqlite3.dbapi2 import Connection
 
 CONFIG_PATH = os.getenv("CONFIG_PATH", "./config.json")
 LOGS_DIR_PATH = os.getenv("LOGS_DIR_PATH", "./logs")
 DEFAULT_HOURS_OLD = 24
 DEFAULT_RESULTS_WANTED = 20
-BATCH_SIZE = 1000
+INSERT_GROUP_SIZE = 500
+JOB_COLUMNS = ["title", "company", "location", "description"]
+UNIQUE_JOB_COLUMNS = ["title", "company", "location"]
+_CLEAN_RE = re.compile(r"[^\w\s-]")
+_job_values = itemgetter(*JOB_COLUMNS)
+_job_key = itemgetter(*UNIQUE_JOB_COLUMNS)
+# At least one query must be allowed in flight, or run() would wait forever.
+MAX_PARALLEL = max(1, int(os.getenv("SCRAPER_CONCURRENCY", "4")))
+MAX_SCRAPE_ATTEMPTS = 3
+CHECKPOINT_RETENTION_DAYS = 7
+_CHECKPOINT_RE = re.compile(r"checkpoint-(\d{8})\.json")
+THRESHOLD_DELAY = 0.5
+RANDOM_INCREMENTAL_DELAY = 1.5
+# Bump whenever RootConfig changes so caches built for the old schema are
+# rejected without revalidating every hit.
+CONFIG_CACHE_VERSION = 2
+
+CREATE_UNIQUE_INDEX_SQL = """CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_job
+    ON job_scraper(title, company, location)"""
+SCHEMA_SQL = f"""
+PRAGMA page_size=8192;
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS job_scraper
+    (id INTEGER PRIMARY KEY,
+     title TEXT,
+     company TEXT,
+     location TEXT,
+     description TEXT,
+     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE INDEX IF NOT EXISTS idx_job_date ON job_scraper(created_at);
+{CREATE_UNIQUE_INDEX_SQL};
+"""
+SEEN_JOBS_SQL = """SELECT title, company, location FROM job_scraper
+    WHERE created_at > datetime('now', ?)"""
+SEEN_JOBS_WINDOW = "-30 days"
+INSERT_JOB_SQL = """INSERT OR IGNORE INTO job_scraper (title, company, location, description)
+    VALUES """
+
+
+@lru_cache(maxsize=None)
+def _insert_jobs_sql(rows: int) -> str:
+    return INSERT_JOB_SQL + ", ".join(["(?, ?, ?, ?)"] * rows)
 
 
 def initialize_logging(log_dir: str) -> None:
+    if os.environ.get("SCRAPER_LOGS_ENABLED", "1") != "1":
+        return
+    _add_log_handler(log_dir)
+
+
+@lru_cache(maxsize=1)
+def _add_log_handler(log_dir: str) -> None:
     os.makedirs(log_dir, exist_ok=True)
     log_file_name = os.path.join(log_dir, f"{datetime.now().strftime('%Y%m%d')}.log")
     logger.add(
@@ -32,83 +90,167 @@ def initialize_logging(log_dir: str) -> None:
     logger.info("Logging initialized successfully.")
 
 
+@dataclass(slots=True, frozen=True)
+class ScraperQuery:
+    site_name: Optional[str]
+    search_term: Optional[str]
+    google_search_term: Optional[str]
+    location: Optional[str]
+    country_indeed: Optional[str]
+
+
+class ScraperConfig(msgspec.Struct):
+    site_names: List[str]
+    search_terms: List[str]
+    google_search_terms: List[str]
+    locations: List[str]
+    countries_indeed: List[str]
+
+
+class RootConfig(msgspec.Struct):
+    scraper_config: ScraperConfig
+
+
+def _query_key(search_query: ScraperQuery) -> str:
+    fields = (
+        search_query.site_name,
+        search_query.search_term,
+        search_query.google_search_term,
+        search_query.location,
+        search_query.country_indeed,
+    )
+    return hashlib.sha1(orjson.dumps(fields)).hexdigest()
+
+
 class ConfigReader:
     def __init__(self, config_path: str):
         self.config_path = config_path
+        self.cache_path = f"{config_path}.cache.pkl"
         self.config_dict = self.read_config_file()
-        self.validate_config(self.config_dict)
 
     def read_config_file(self) -> Dict[str, Any]:
         try:
-            with open(self.config_path, "r") as f:
-                config = json.load(f)
+            mtime = os.stat(self.config_path).st_mtime_ns
+            config = self.read_config_cache(mtime)
+            if config is not None:
+                logger.info("Config loaded from cache.")
+                return config
+            with open(self.config_path, "rb") as f:
+                config = msgspec.to_builtins(
+                    msgspec.json.decode(f.read(), type=RootConfig)
+                )
             logger.info("Config parsed successfully.")
-            return config
         except FileNotFoundError:
             logger.error(f"The file {self.config_path} was not found.")
             raise
-        except json.JSONDecodeError:
+        except msgspec.ValidationError as e:
+            logger.error(f"Invalid configuration in {self.config_path}: {str(e)}")
+            raise ValueError(str(e)) from e
+        except msgspec.DecodeError:
             logger.error(f"Failed to decode JSON from the file {self.config_path}.")
             raise
+        self.write_config_cache(mtime, config)
+        return config
 
-    def validate_config(self, config: Dict[str, Any]) -> None:
-        required_types = {
-            "site_names": list,
-            "search_terms": list,
-            "google_search_terms": list,
-            "locations": list,
-            "countries_indeed": list,
-        }
-        scraper_config = config.get("scraper_config", {})
-        for key, expected_type in required_types.items():
-            if not isinstance(scraper_config.get(key), expected_type):
-                raise ValueError(f"{key} must be a {expected_type.__name__}")
+    def read_config_cache(self, mtime: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.cache_path, "rb") as f:
+                version, cached_mtime, config = pickle.load(f)
+        except Exception:
+            # Unpickling can fail in many ways (truncated file, renamed class,
+            # wrong shape); any unreadable cache is just a miss.
+            return None
+        if version != CONFIG_CACHE_VERSION or cached_mtime != mtime:
+            return None
+        if not isinstance(config, dict):
+            return None
+        return config
+
+    def write_config_cache(self, mtime: int, config: Dict[str, Any]) -> None:
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump((CONFIG_CACHE_VERSION, mtime, config), f, protocol=5)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Failed to write config cache: {str(e)}")
 
 
 class JobAggregator:
     SQLITE_DB_PATH = "./job_scraper.db"
 
-    def __init__(self, config_reader: ConfigReader):
+    def __init__(
+        self, config_reader: ConfigReader, checkpoint_dir: str = LOGS_DIR_PATH
+    ):
         self.config_reader = config_reader
+        self.checkpoint_path = os.path.join(
+            checkpoint_dir, f"checkpoint-{datetime.now().strftime('%Y%m%d')}.json"
+        )
         self.scraper_query_sequence = self.parse_search_query_sequence()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            self.SQLITE_DB_PATH,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        # Per-connection settings; journal_mode and page_size persist in the
+        # database file and are set once in initialize_db.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._conn.execute("PRAGMA cache_size=-65536")
         self.initialize_db()
 
+    def close(self) -> None:
+        conn, self._conn = getattr(self, "_conn", None), None
+        if conn is not None:
+            conn.close()
+
+    def __del__(self):
+        self.close()
+
     @contextmanager
     def get_db_connection(self) -> Any:
-        conn = sqlite3.connect(self.SQLITE_DB_PATH)
-        try:
-            yield conn
-        finally:
-            conn.close()
+        with self._lock:
+            yield self._conn
 
     def initialize_db(self):
         with self.get_db_connection() as conn:
-            conn.execute(
-                """CREATE TABLE IF NOT EXISTS job_scraper 
-                        (id INTEGER PRIMARY KEY, 
-                         title TEXT, 
-                         company TEXT, 
-                         location TEXT, 
-                         description TEXT,
-                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"""
-            )
-            conn.execute(
-                """CREATE INDEX IF NOT EXISTS idx_job_date 
-                          ON job_scraper(created_at)"""
-            )
-            conn.execute(
-                """CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_job 
-                          ON job_scraper(title, company, location)"""
-            )
+            conn.executescript(SCHEMA_SQL)
+
+    def _drop_unique_index(self, conn: Connection) -> None:
+        conn.execute("DROP INDEX IF EXISTS idx_unique_job")
+
+    def _create_unique_index(self, conn: Connection) -> None:
+        conn.execute(CREATE_UNIQUE_INDEX_SQL)
 
     def backup_database(self) -> None:
         backup_path = f"{self.SQLITE_DB_PATH}.backup"
-        with sqlite3.connect(self.SQLITE_DB_PATH) as source:
-            backup = sqlite3.connect(backup_path)
-            source.backup(backup)
+        # The lock is held across the copy so no autocheckpoint on this
+        # connection can rewrite the main file mid-copy.
+        with self.get_db_connection() as conn:
+            busy, log, checkpointed = conn.execute(
+                "PRAGMA wal_checkpoint(TRUNCATE)"
+            ).fetchone()
+            if busy == 0 and checkpointed == log:
+                # Every committed page is in the main file, so a plain file copy
+                # is a consistent snapshot.
+                try:
+                    shutil.copyfile(self.SQLITE_DB_PATH, backup_path)
+                except OSError as e:
+                    logger.error(f"Failed to back up database: {str(e)}")
+                    return
+            else:
+                # An open reader blocked the checkpoint, so the main file alone
+                # is incomplete; fall back to SQLite's online backup.
+                backup = sqlite3.connect(backup_path)
+                try:
+                    conn.backup(backup)
+                finally:
+                    backup.close()
         logger.info(f"Database backed up to {backup_path}")
 
-    def parse_search_query_sequence(self) -> List[namedtuple]:
+    def parse_search_query_sequence(self) -> List[ScraperQuery]:
         scraper_config = self.config_reader.config_dict.get("scraper_config")
         if not scraper_config:
             logger.error("Missing 'scraper_config' in configuration file.")
@@ -146,29 +288,13 @@ class JobAggregator:
             logger.error("No search parameters found in 'scraper_config'.")
             raise ValueError("Invalid configuration: No search parameters found.")
 
-        search_query = namedtuple(
-            "scraper_query",
-            [
-                "site_name",
-                "search_term",
-                "google_search_term",
-                "location",
-                "country_indeed",
-            ],
-        )
+        site_name = site_names[0] if site_names else None
+        search_term = search_terms[0] if search_terms else None
         queries = [
-            search_query(
-                site_name=site_names[0] if site_names else None,
-                search_term=search_terms[0] if search_terms else None,
-                google_search_term=(
-                    google_search_terms[i] if i < len(google_search_terms) else None
-                ),
-                location=locations[i] if i < len(locations) else None,
-                country_indeed=(
-                    countries_indeed[i] if i < len(countries_indeed) else None
-                ),
+            ScraperQuery(site_name, search_term, google_search_term, location, country)
+            for google_search_term, location, country in zip_longest(
+                google_search_terms, locations, countries_indeed
             )
-            for i in range(param_size - 1)
         ]
         logger.info("Search query sequence parsed successfully.")
         return queries
@@ -178,78 +304,287 @@ class JobAggregator:
         search_query,
         hours_old: int = DEFAULT_HOURS_OLD,
         results_wanted: int = DEFAULT_RESULTS_WANTED,
-    ) -> pd.DataFrame:
-        try:
-            results = scrape_jobs(
-                site_name=search_query.site_name,
-                search_term=search_query.search_term,
-                google_search_term=search_query.google_search_term,
-                location=search_query.location,
-                results_wanted=results_wanted,
-                hours_old=hours_old,
-                country_indeed=search_query.country_indeed,
+    ) -> List[Dict[str, Any]]:
+        error = None
+        for attempt in range(MAX_SCRAPE_ATTEMPTS):
+            try:
+                results = scrape_jobs(
+                    site_name=search_query.site_name,
+                    search_term=search_query.search_term,
+                    google_search_term=search_query.google_search_term,
+                    location=search_query.location,
+                    results_wanted=results_wanted,
+                    hours_old=hours_old,
+                    country_indeed=search_query.country_indeed,
+                )
+            except Exception as e:
+                error = e
+                logger.warning(f"Scrape attempt {attempt + 1} failed: {str(e)}")
+                if attempt + 1 < MAX_SCRAPE_ATTEMPTS:
+                    sleep(2**attempt + random.random())
+                continue
+            sleep(THRESHOLD_DELAY + random.random() * RANDOM_INCREMENTAL_DELAY)
+            return results.reindex(columns=JOB_COLUMNS).to_dict("records")
+
+        logger.error(f"Failed to scrape jobs: {str(error)}")
+        return []
+
+    def validate_job_data(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        validated = []
+        seen = set()
+        for job in jobs:
+            cleaned = {
+                col: _CLEAN_RE.sub("", value) if isinstance(value, str) else value
+                for col, value in zip(JOB_COLUMNS, map(job.get, JOB_COLUMNS))
+            }
+            key = tuple(cleaned[col] for col in UNIQUE_JOB_COLUMNS)
+            if not all(isinstance(value, str) and value for value in key):
+                continue
+            if key in seen:
+                continue
+            seen.add(key)
+            validated.append(cleaned)
+        return validated
+
+    def run(self) -> int:
+        self.prune_checkpoints()
+        completed = self.load_checkpoint()
+        pending = [
+            search_query
+            for search_query in self.scraper_query_sequence
+            if _query_key(search_query) not in completed
+        ]
+        if len(pending) < len(self.scraper_query_sequence):
+            logger.info(
+                f"Skipping {len(self.scraper_query_sequence) - len(pending)} "
+                "search queries already completed today"
             )
-            sleep(1)
-            return results
-        except Exception as e:
-            logger.error(f"Failed to scrape jobs: {str(e)}")
-            return pd.DataFrame()
-
-    def validate_job_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        return (
-            df.dropna(subset=["title", "company", "location"])
-            .drop_duplicates()
-            .replace({r"[^\w\s-]": ""}, regex=True)
-        )
-
-    def run(self) -> pd.DataFrame:
-        results = self.combine_results(self.collect_search_query_results())
-        return self.validate_job_data(results)
-
-    def collect_search_query_results(self) -> List[pd.DataFrame]:
-        results = [
-            self.run_search_query(search_query)
-            for search_query in tqdm(
-                self.scraper_query_sequence, "Running search queries"
+        # On the initial load there is nothing to dedup against, so the unique
+        # index is rebuilt once at the end instead of per row. That run is kept
+        # to a single transaction, so a crash cannot leave the table unindexed.
+        with self.get_db_connection() as conn:
+            initial_load = (
+                conn.execute("SELECT 1 FROM job_scraper LIMIT 1").fetchone() is None
             )
-        ]
-        return results
-
-    def combine_results(self, results: List[pd.DataFrame]) -> pd.DataFrame:
-        if not results:
-            return pd.DataFrame()
-        return pd.concat(results, axis=0, ignore_index=True)
+        with self.bulk_insert_transaction(defer_unique_index=initial_load) as conn:
+            saved = asyncio.run(
+                self._stream_all(
+                    conn, pending, completed, commit_each=not initial_load
+                )
+            )
+        if initial_load and completed:
+            self.save_checkpoint(completed)
+        return saved
 
-    def save_to_db(self, df: pd.DataFrame) -> None:
-        if df.empty:
-            logger.info("No new jobs to save to database")
+    async def _stream_all(
+        self,
+        conn: Connection,
+        search_queries: List[ScraperQuery],
+        completed: Set[str],
+        commit_each: bool = True,
+    ) -> int:
+        # Each query's jobs are written as soon as it finishes, so results are
+        # never accumulated. Writes stay on the event loop thread, which owns
+        # the SQLite connection.
+        # The bounded queue keeps finished frames from piling up while the
+        # consumer is busy writing.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_PARALLEL)
+        sem = asyncio.Semaphore(MAX_PARALLEL)
+        with tqdm(total=len(search_queries), desc="Running search queries") as progress:
+            seen = self.load_seen_jobs(conn)
+            consumer = asyncio.create_task(
+                self._consume_frames(queue, conn, seen, completed, commit_each)
+            )
+            producers = [
+                asyncio.create_task(
+                    self._produce_frame(search_query, sem, progress, queue)
+                )
+                for search_query in search_queries
+            ]
+            gathered = asyncio.gather(*producers, return_exceptions=True)
+            done, _ = await asyncio.wait(
+                {consumer, gathered}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if consumer in done:
+                # The consumer only stops early when a write failed, which
+                # aborts the run. Cancel the remaining queries rather than
+                # scraping results that can no longer be saved.
+                for producer in producers:
+                    producer.cancel()
+                await gathered
+                await consumer
+            results = await gathered
+            await queue.put(None)
+            saved = await consumer
+
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error(f"Search query failed: {str(result)}")
+        logger.info(f"Saved {saved} jobs to database")
+        return saved
+
+    async def _produce_frame(
+        self,
+        search_query,
+        sem: asyncio.Semaphore,
+        progress: tqdm,
+        queue: asyncio.Queue,
+    ) -> None:
+        frame = await self._run_query_async(search_query, sem, progress)
+        await queue.put((search_query, frame))
+
+    async def _consume_frames(
+        self,
+        queue: asyncio.Queue,
+        conn: Connection,
+        seen: Set[Tuple[str, ...]],
+        completed: Set[str],
+        commit_each: bool = True,
+    ) -> int:
+        saved = 0
+        while (item := await queue.get()) is not None:
+            search_query, frame = item
+            saved += self.save_frame(frame, conn, seen)
+            # A failed scrape also returns no jobs, so only queries that
+            # produced results are checkpointed, and only once they are committed.
+            if frame:
+                completed.add(_query_key(search_query))
+                if commit_each:
+                    conn.commit()
+                    conn.execute("BEGIN")
+                    self.save_checkpoint(completed)
+        return saved
+
+    def load_checkpoint(self) -> Set[str]:
+        try:
+            with open(self.checkpoint_path, "rb") as f:
+                return set(orjson.loads(f.read()))
+        except (OSError, orjson.JSONDecodeError):
+            return set()
+
+    def prune_checkpoints(self) -> None:
+        # Checkpoints share the logs directory but not loguru's retention.
+        checkpoint_dir = os.path.dirname(self.checkpoint_path) or "."
+        cutoff = datetime.now() - timedelta(days=CHECKPOINT_RETENTION_DAYS)
+        try:
+            names = os.listdir(checkpoint_dir)
+        except OSError:
             return
+        for name in names:
+            match = _CHECKPOINT_RE.fullmatch(name)
+            if match and match.group(1) < cutoff.strftime("%Y%m%d"):
+                try:
+                    os.remove(os.path.join(checkpoint_dir, name))
+                except OSError as e:
+                    logger.warning(f"Failed to remove old checkpoint {name}: {str(e)}")
+
+    def save_checkpoint(self, completed: Set[str]) -> None:
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(sorted(completed)))
+        os.replace(tmp_path, self.checkpoint_path)
+
+    async def _run_query_async(
+        self, search_query, sem: asyncio.Semaphore, progress: tqdm
+    ) -> List[Dict[str, Any]]:
+        async with sem:
+            result = await asyncio.to_thread(self.run_search_query, search_query)
+        progress.update(1)
+        return result
 
-        for i in range(0, len(df), BATCH_SIZE):
-            batch = df[i : i + BATCH_SIZE]
-            with self.get_db_connection() as conn:
-                jobs_to_insert = batch[
-                    ["title", "company", "location", "description"]
-                ].to_dict("records")
-                conn.executemany(
-                    """INSERT OR IGNORE INTO job_scraper (title, company, location, description)
-                       VALUES (:title, :company, :location, :description)""",
-                    jobs_to_insert,
-                )
-            logger.info(f"Saved batch of {len(jobs_to_insert)} jobs to database")
+    @contextmanager
+    def bulk_insert_transaction(self, defer_unique_index: bool = False) -> Any:
+        with self.get_db_connection() as conn:
+            # Only the single-transaction initial load can skip syncs: it either
+            # commits once at the end or rolls back entirely. Per-query commits
+            # back checkpoints, so they keep synchronous=NORMAL.
+            if defer_unique_index:
+                conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("BEGIN")
+            try:
+                if defer_unique_index:
+                    self._drop_unique_index(conn)
+                yield conn
+                if defer_unique_index:
+                    self._create_unique_index(conn)
+                conn.commit()
+            except BaseException:
+                # The connection outlives this call, so never leave it mid-transaction.
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            finally:
+                conn.execute("PRAGMA synchronous=NORMAL")
+
+    def insert_jobs(self, conn: Connection, jobs: List[Dict[str, Any]]) -> None:
+        # SQLite builds before 3.32 cap bound parameters at 999 by default.
+        # Connection.getlimit only exists on Python 3.11+, so assume that cap
+        # when the real limit cannot be read.
+        getlimit = getattr(conn, "getlimit", None)
+        variable_limit = (
+            getlimit(getattr(sqlite3, "SQLITE_LIMIT_VARIABLE_NUMBER", 9))
+            if getlimit is not None
+            else 999
+        )
+        group_size = min(INSERT_GROUP_SIZE, variable_limit // len(JOB_COLUMNS))
+        for i in range(0, len(jobs), group_size):
+            group = jobs[i : i + group_size]
+            conn.execute(
+                _insert_jobs_sql(len(group)),
+                list(chain.from_iterable(map(_job_values, group))),
+            )
+        if jobs:
+            logger.info(f"Saved {len(jobs)} jobs to database")
+
+    def load_seen_jobs(self, conn: Connection) -> Set[Tuple[str, ...]]:
+        return set(conn.execute(SEEN_JOBS_SQL, (SEEN_JOBS_WINDOW,)))
+
+    def filter_seen_jobs(
+        self, jobs: List[Dict[str, Any]], seen: Set[Tuple[str, ...]]
+    ) -> List[Dict[str, Any]]:
+        # Skipping known jobs here saves a unique index probe per duplicate row;
+        # INSERT OR IGNORE still covers anything older than the window.
+        new_jobs = []
+        for job in jobs:
+            key = _job_key(job)
+            if key in seen:
+                continue
+            seen.add(key)
+            new_jobs.append(job)
+        return new_jobs
+
+    def save_frame(
+        self,
+        jobs: List[Dict[str, Any]],
+        conn: Connection,
+        seen: Optional[Set[Tuple[str, ...]]] = None,
+    ) -> int:
+        if not jobs:
+            return 0
+        jobs = self.validate_job_data(jobs)
+        if seen is not None:
+            jobs = self.filter_seen_jobs(jobs, seen)
+        self.insert_jobs(conn, jobs)
+        return len(jobs)
 
 
 def main(config_path: str, log_dir_path: str) -> None:
     initialize_logging(log_dir=log_dir_path)
     config_reader = ConfigReader(config_path=config_path)
-    job_aggregator = JobAggregator(config_reader=config_reader)
+    job_aggregator = JobAggregator(
+        config_reader=config_reader, checkpoint_dir=log_dir_path
+    )
 
-    # Create database backup before starting
-    job_aggregator.backup_database()
+    try:
+        # Create database backup before starting
+        job_aggregator.backup_database()
 
-    # Run the job scraping process
-    scraped_jobs = job_aggregator.run()
-    job_aggregator.save_to_db(scraped_jobs)
+        # Run the job scraping process, saving each query's results as they arrive
+        job_aggregator.run()
+    finally:
+        job_aggregator.close()
 
 
 if __name__ == "__main__":
@@ -1,18 +1,41 @@
 import unittest
 import os
 import json
+import time
+import pickle
 import sqlite3
+import tempfile
+import msgspec
 import pandas as pd
 from unittest.mock import patch, MagicMock
 from get_jobs import (
     initialize_logging,
     ConfigReader,
+    CONFIG_CACHE_VERSION,
+    RootConfig,
     JobAggregator,
+    ScraperQuery,
     DEFAULT_HOURS_OLD,
     DEFAULT_RESULTS_WANTED,
+    JOB_COLUMNS,
+    MAX_SCRAPE_ATTEMPTS,
+    _query_key,
 )
 from collections import namedtuple
 
+CONFIG_CACHE_PATH = "./config.json.cache.pkl"
+
+
+def make_query(name):
+    return ScraperQuery("indeed", "python", name, name, "GB")
+
+
+class TestInitializeLogging(unittest.TestCase):
+    @patch.dict(os.environ, {"SCRAPER_LOGS_ENABLED": "0"})
+    def test_initialize_logging_disabled(self):
+        initialize_logging("./test_logs")
+        self.assertFalse(os.path.exists("./test_logs"))
+
 
 class TestConfigReader(unittest.TestCase):
     def setUp(self):
@@ -26,31 +49,69 @@ class TestConfigReader(unittest.TestCase):
                 "countries_indeed": ["GB"],
             }
         }
+        if os.path.exists(CONFIG_CACHE_PATH):
+            os.remove(CONFIG_CACHE_PATH)
 
     def tearDown(self):
         if os.path.exists(self.test_config_path):
             os.remove(self.test_config_path)
+        if os.path.exists(CONFIG_CACHE_PATH):
+            os.remove(CONFIG_CACHE_PATH)
 
-    @patch("get_jobs.json.load")
-    def test_read_config_file_success(self, mock_json_load):
-        mock_json_load.return_value = self.test_config
+    @patch("get_jobs.msgspec.json.decode")
+    def test_read_config_file_success(self, mock_decode):
+        mock_decode.return_value = msgspec.convert(self.test_config, type=RootConfig)
         config_reader = ConfigReader("./config.json")
         self.assertEqual(config_reader.config_dict, self.test_config)
 
+    @patch("get_jobs.msgspec.json.decode")
+    def test_read_config_file_uses_cache(self, mock_decode):
+        mock_decode.return_value = msgspec.convert(self.test_config, type=RootConfig)
+        ConfigReader("./config.json")
+        config_reader = ConfigReader("./config.json")
+        self.assertEqual(config_reader.config_dict, self.test_config)
+        mock_decode.assert_called_once()
+
+    def test_read_config_file_ignores_stale_cache_version(self):
+        stale_config = {"scraper_config": {**self.test_config["scraper_config"]}}
+        stale_config["scraper_config"]["locations"] = [1, 2]
+        mtime = os.stat("./config.json").st_mtime_ns
+        with open(CONFIG_CACHE_PATH, "wb") as f:
+            pickle.dump((CONFIG_CACHE_VERSION - 1, mtime, stale_config), f)
+        config_reader = ConfigReader("./config.json")
+        locations = config_reader.config_dict["scraper_config"]["locations"]
+        self.assertTrue(all(isinstance(location, str) for location in locations))
+
+    def test_read_config_file_ignores_malformed_cache(self):
+        mtime = os.stat("./config.json").st_mtime_ns
+        for cached in (1, (CONFIG_CACHE_VERSION, mtime, ["not", "a", "dict"])):
+            with open(CONFIG_CACHE_PATH, "wb") as f:
+                pickle.dump(cached, f)
+            config_reader = ConfigReader("./config.json")
+            self.assertIn("scraper_config", config_reader.config_dict)
+
     @patch("get_jobs.open", side_effect=FileNotFoundError)
     def test_read_config_file_filenotfound(self, mock_open):
         with self.assertRaises(FileNotFoundError):
             ConfigReader("./config.json")
 
-    @patch("get_jobs.json.load", side_effect=json.JSONDecodeError("error", "", 0))
-    def test_read_config_file_jsondecodeerror(self, mock_json_load):
-        with self.assertRaises(json.JSONDecodeError):
+    @patch("get_jobs.msgspec.json.decode", side_effect=msgspec.DecodeError("error"))
+    def test_read_config_file_jsondecodeerror(self, mock_decode):
+        with self.assertRaises(msgspec.DecodeError):
             ConfigReader("./config.json")
 
+    def test_read_config_file_invalid_schema(self):
+        self.test_config["scraper_config"]["locations"] = "London"
+        with open(self.test_config_path, "w") as f:
+            json.dump(self.test_config, f)
+        with self.assertRaises(ValueError):
+            ConfigReader(self.test_config_path)
+
 
 class TestJobAggregator(unittest.TestCase):
     def setUp(self):
         self.test_db_path = "./test_job_scraper.db"
+        self.test_checkpoint_path = "./test_checkpoint.json"
         self.mock_config = {
             "scraper_config": {
                 "site_names": ["indeed"],
@@ -62,82 +123,269 @@ class TestJobAggregator(unittest.TestCase):
         }
         self.config_reader = ConfigReader("./config.json")
         self.config_reader.config_dict = self.mock_config
-        self.job_aggregator = JobAggregator(self.config_reader)
+        with patch.object(JobAggregator, "SQLITE_DB_PATH", self.test_db_path):
+            self.job_aggregator = JobAggregator(self.config_reader)
         self.job_aggregator.SQLITE_DB_PATH = self.test_db_path
+        self.job_aggregator.checkpoint_path = self.test_checkpoint_path
 
     def tearDown(self):
-        if os.path.exists(self.test_db_path):
-            os.remove(self.test_db_path)
-        if os.path.exists(f"{self.test_db_path}.backup"):
-            os.remove(f"{self.test_db_path}.backup")
+        self.job_aggregator.close()
+        for path in (self.test_db_path, f"{self.test_db_path}.backup"):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(f"{path}{suffix}"):
+                    os.remove(f"{path}{suffix}")
+        if os.path.exists(CONFIG_CACHE_PATH):
+            os.remove(CONFIG_CACHE_PATH)
+        if os.path.exists(self.test_checkpoint_path):
+            os.remove(self.test_checkpoint_path)
+
+    def run_with_frames(self, frames):
+        queries = {make_query(name): jobs for name, jobs in frames.items()}
+        self.job_aggregator.scraper_query_sequence = list(queries)
+        with patch.object(
+            self.job_aggregator, "run_search_query", side_effect=queries.get
+        ):
+            return self.job_aggregator.run()
 
     def test_initialize_db(self):
         self.job_aggregator.initialize_db()
         self.assertTrue(os.path.exists(self.test_db_path))
+        with sqlite3.connect(self.test_db_path) as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(journal_mode, "wal")
 
     def test_validate_job_data(self):
-        test_data = pd.DataFrame(
+        test_data = [
+            {"title": "Test Job", "company": "Corp", "location": "NY"},
+            {"title": None, "company": "Inc", "location": "SF"},
+            {"title": "Dev", "company": float("nan"), "location": "LA"},
+        ]
+        result = self.job_aggregator.validate_job_data(test_data)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]["title"], "Test Job")
+
+    def test_validate_job_data_cleans_text_columns(self):
+        test_data = [
             {
-                "title": ["Test Job", None, "Dev"],
-                "company": ["Corp", "Inc", None],
-                "location": ["NY", "SF", "LA"],
-                "description": ["desc1", "desc2", "desc3"],
-            }
-        )
+                "title": "Senior Dev!",
+                "company": "Corp, Inc.",
+                "location": "NY",
+                "description": "first (desc)",
+            },
+            {
+                "title": "Senior Dev",
+                "company": "Corp Inc",
+                "location": "NY",
+                "description": "second",
+            },
+        ]
         result = self.job_aggregator.validate_job_data(test_data)
         self.assertEqual(len(result), 1)
-        self.assertEqual(result.iloc[0]["title"], "Test Job")
+        self.assertEqual(result[0]["title"], "Senior Dev")
+        self.assertEqual(result[0]["company"], "Corp Inc")
+        self.assertEqual(result[0]["description"], "first desc")
 
-    @patch("sqlite3.connect")
-    def test_save_to_db(self, mock_connect):
+    def test_insert_jobs(self):
         mock_conn = MagicMock()
-        mock_connect.return_value = mock_conn
-        test_df = pd.DataFrame(
+        mock_conn.getlimit.return_value = 32766
+        test_jobs = [
             {
-                "title": ["Test Job"],
-                "company": ["Test Corp"],
-                "location": ["Test Location"],
-                "description": ["Test Description"],
+                "title": "Test Job",
+                "company": "Test Corp",
+                "location": "Test Location",
+                "description": "Test Description",
             }
+        ]
+        self.job_aggregator.insert_jobs(mock_conn, test_jobs)
+        inserts = [
+            c for c in mock_conn.execute.call_args_list if "INSERT" in c.args[0]
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            inserts[0].args[1],
+            ["Test Job", "Test Corp", "Test Location", "Test Description"],
         )
-        self.job_aggregator.save_to_db(test_df)
-        mock_conn.executemany.assert_called_once()
+
+    def test_run_initial_load_rebuilds_unique_index(self):
+        self.job_aggregator.initialize_db()
+        with patch.object(
+            self.job_aggregator,
+            "_drop_unique_index",
+            wraps=self.job_aggregator._drop_unique_index,
+        ) as mock_drop:
+            self.run_with_frames(
+                {
+                    "q1": [{"title": "Job A", "company": "Corp", "location": "NY"}],
+                    "q2": [{"title": "Job B", "company": "Corp", "location": "NY"}],
+                }
+            )
+        mock_drop.assert_called_once()
+        with sqlite3.connect(self.test_db_path) as conn:
+            count = conn.execute("SELECT COUNT(*) FROM job_scraper").fetchone()[0]
+            index = conn.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'idx_unique_job'"
+            ).fetchone()
+        self.assertEqual(count, 2)
+        self.assertIsNotNone(index)
+        self.assertEqual(len(self.job_aggregator.load_checkpoint()), 2)
+
+    def test_run_initial_load_failure_keeps_unique_index(self):
+        self.job_aggregator.initialize_db()
+        with patch.object(
+            self.job_aggregator, "insert_jobs", side_effect=sqlite3.OperationalError
+        ):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.run_with_frames(
+                    {"q1": [{"title": "Job A", "company": "Corp", "location": "NY"}]}
+                )
+        with sqlite3.connect(self.test_db_path) as conn:
+            index = conn.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'idx_unique_job'"
+            ).fetchone()
+        self.assertIsNotNone(index)
+        self.assertEqual(self.job_aggregator.load_checkpoint(), set())
+
+    def test_bulk_insert_synchronous_off_only_for_initial_load(self):
+        mock_conn = MagicMock()
+        self.job_aggregator.close()
+        self.job_aggregator._conn = mock_conn
+        for defer_unique_index in (False, True):
+            mock_conn.reset_mock()
+            with self.job_aggregator.bulk_insert_transaction(
+                defer_unique_index=defer_unique_index
+            ):
+                pass
+            statements = [c.args[0] for c in mock_conn.execute.call_args_list]
+            self.assertEqual(
+                "PRAGMA synchronous=OFF" in statements, defer_unique_index
+            )
+
+    def test_bulk_insert_failure_rolls_back(self):
+        self.job_aggregator.initialize_db()
+        with self.assertRaises(KeyError):
+            with self.job_aggregator.bulk_insert_transaction() as conn:
+                self.job_aggregator.insert_jobs(conn, [{"title": "Job A"}])
+        self.assertFalse(self.job_aggregator._conn.in_transaction)
+
+    def test_run_skips_recently_seen_jobs(self):
+        job = {"title": "Job A", "company": "Corp", "location": "NY"}
+        self.job_aggregator.initialize_db()
+        self.run_with_frames({"q1": [job]})
+        with patch.object(self.job_aggregator, "insert_jobs") as mock_insert_jobs:
+            self.run_with_frames({"q2": [job, {**job, "title": "Job B"}]})
+        inserted = mock_insert_jobs.call_args[0][1]
+        self.assertEqual([j["title"] for j in inserted], ["Job B"])
 
     def test_batch_processing(self):
-        large_df = pd.DataFrame(
+        large_jobs = [
             {
-                "title": ["Job"] * 2500,
-                "company": ["Company"] * 2500,
-                "location": ["Location"] * 2500,
-                "description": ["Description"] * 2500,
+                "title": f"Job {i}",
+                "company": "Company",
+                "location": "Location",
+                "description": "Description",
             }
-        )
+            for i in range(1200)
+        ]
+        mock_conn = MagicMock()
+        mock_conn.getlimit.return_value = 32766
+        self.job_aggregator.close()
+        self.job_aggregator._conn = mock_conn
         with patch("sqlite3.connect") as mock_connect:
-            mock_conn = MagicMock()
-            mock_connect.return_value = mock_conn
-            self.job_aggregator.save_to_db(large_df)
-            self.assertEqual(mock_connect.call_count, 3)
+            with self.job_aggregator.bulk_insert_transaction() as conn:
+                self.job_aggregator.insert_jobs(conn, large_jobs)
+            mock_connect.assert_not_called()
+            inserts = [
+                c for c in mock_conn.execute.call_args_list if "INSERT" in c.args[0]
+            ]
+            self.assertEqual([len(c.args[1]) for c in inserts], [2000, 2000, 800])
+            mock_conn.commit.assert_called_once()
+
+    def test_insert_jobs_respects_variable_limit(self):
+        mock_conn = MagicMock()
+        mock_conn.getlimit.return_value = 999
+        jobs = [
+            {"title": f"Job {i}", "company": "C", "location": "NY", "description": ""}
+            for i in range(300)
+        ]
+        self.job_aggregator.insert_jobs(mock_conn, jobs)
+        inserts = [
+            c for c in mock_conn.execute.call_args_list if "INSERT" in c.args[0]
+        ]
+        self.assertEqual([len(c.args[1]) for c in inserts], [996, 204])
+
+    def test_insert_jobs_without_getlimit(self):
+        mock_conn = MagicMock(spec=["execute"])
+        jobs = [
+            {"title": f"Job {i}", "company": "C", "location": "NY", "description": ""}
+            for i in range(300)
+        ]
+        self.job_aggregator.insert_jobs(mock_conn, jobs)
+        inserts = [
+            c for c in mock_conn.execute.call_args_list if "INSERT" in c.args[0]
+        ]
+        self.assertEqual([len(c.args[1]) for c in inserts], [996, 204])
 
     def test_database_backup(self):
-        with patch("sqlite3.connect") as mock_connect:
-            mock_connect.side_effect = sqlite3.Error
-            with self.assertRaises(sqlite3.Error):
-                self.job_aggregator.backup_database()
+        mock_conn = MagicMock()
+        mock_conn.execute.side_effect = sqlite3.Error
+        self.job_aggregator.close()
+        self.job_aggregator._conn = mock_conn
+        with self.assertRaises(sqlite3.Error):
+            self.job_aggregator.backup_database()
+
+    def test_parse_search_query_sequence_includes_last_query(self):
+        self.config_reader.config_dict = {
+            "scraper_config": {
+                "site_names": ["indeed"],
+                "search_terms": ["python"],
+                "google_search_terms": ["python developer London"],
+                "locations": ["London", "Dublin"],
+                "countries_indeed": ["UK", "Ireland"],
+            }
+        }
+        queries = self.job_aggregator.parse_search_query_sequence()
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(queries[-1].location, "Dublin")
+        self.assertEqual(queries[-1].country_indeed, "Ireland")
+        self.assertIsNone(queries[-1].google_search_term)
+        self.assertEqual(queries[-1].site_name, "indeed")
+
+    def test_database_backup_copies_committed_rows(self):
+        self.job_aggregator.initialize_db()
+        self.run_with_frames(
+            {"q1": [{"title": "Test Job", "company": "Corp", "location": "NY"}]}
+        )
+        self.job_aggregator.backup_database()
+        with sqlite3.connect(f"{self.test_db_path}.backup") as conn:
+            count = conn.execute("SELECT COUNT(*) FROM job_scraper").fetchone()[0]
+        self.assertEqual(count, 1)
+
+    def test_database_backup_with_open_reader(self):
+        self.job_aggregator.initialize_db()
+        self.run_with_frames(
+            {"q1": [{"title": "Job A", "company": "Corp", "location": "NY"}]}
+        )
+        reader = sqlite3.connect(self.test_db_path)
+        reader.execute("BEGIN")
+        reader.execute("SELECT COUNT(*) FROM job_scraper").fetchone()
+        self.run_with_frames(
+            {"q2": [{"title": "Job B", "company": "Corp", "location": "NY"}]}
+        )
+        with patch("get_jobs.shutil.copyfile") as mock_copyfile:
+            self.job_aggregator.backup_database()
+        reader.close()
+        mock_copyfile.assert_not_called()
+        with sqlite3.connect(f"{self.test_db_path}.backup") as conn:
+            integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            count = conn.execute("SELECT COUNT(*) FROM job_scraper").fetchone()[0]
+        self.assertEqual(integrity, "ok")
+        self.assertEqual(count, 2)
 
     @patch("get_jobs.scrape_jobs")
     def test_run_search_query(self, mock_scrape_jobs):
         mock_df = pd.DataFrame({"title": ["test"]})
         mock_scrape_jobs.return_value = mock_df
-        search_query = namedtuple(
-            "scraper_query",
-            [
-                "site_name",
-                "search_term",
-                "google_search_term",
-                "location",
-                "country_indeed",
-            ],
-        )(
+        search_query = ScraperQuery(
             site_name="indeed",
             search_term="python",
             google_search_term="python developer",
@@ -145,17 +393,116 @@ class TestJobAggregator(unittest.TestCase):
             country_indeed="GB",
         )
         result = self.job_aggregator.run_search_query(search_query)
-        self.assertEqual(result.shape, mock_df.shape)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]["title"], "test")
+        self.assertEqual(set(result[0]), set(JOB_COLUMNS))
+
+    @patch("get_jobs.sleep")
+    @patch("get_jobs.scrape_jobs")
+    def test_run_search_query_retries(self, mock_scrape_jobs, mock_sleep):
+        mock_scrape_jobs.side_effect = [
+            Exception("rate limited"),
+            pd.DataFrame({"title": ["test"]}),
+        ]
+        search_query = MagicMock()
+        result = self.job_aggregator.run_search_query(search_query)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(mock_scrape_jobs.call_count, 2)
+
+    @patch("get_jobs.sleep")
+    @patch("get_jobs.scrape_jobs", side_effect=Exception("blocked"))
+    def test_run_search_query_gives_up(self, mock_scrape_jobs, mock_sleep):
+        result = self.job_aggregator.run_search_query(MagicMock())
+        self.assertEqual(result, [])
+        self.assertEqual(mock_scrape_jobs.call_count, MAX_SCRAPE_ATTEMPTS)
 
-    def test_combine_results_empty(self):
-        result = self.job_aggregator.combine_results([])
-        self.assertTrue(result.empty)
+    def test_run_streams_frames_to_db(self):
+        self.job_aggregator.initialize_db()
+        self.run_with_frames(
+            {
+                "q1": [
+                    {"title": "Job A", "company": "Corp", "location": "NY"},
+                    {"title": "Job B", "company": "Corp", "location": "NY"},
+                ],
+                "q2": [{"title": "Job A", "company": "Corp", "location": "NY"}],
+                "q3": [],
+            }
+        )
+        with sqlite3.connect(self.test_db_path) as conn:
+            count = conn.execute("SELECT COUNT(*) FROM job_scraper").fetchone()[0]
+        self.assertEqual(count, 2)
+
+    def test_run_cancels_queries_after_write_failure(self):
+        self.job_aggregator.initialize_db()
+        self.job_aggregator.scraper_query_sequence = [
+            make_query(f"q{i}") for i in range(20)
+        ]
+
+        def slow_search(search_query):
+            time.sleep(0.05)
+            return [{"title": "Job A", "company": "Corp", "location": "NY"}]
+
+        with patch.object(
+            self.job_aggregator, "run_search_query", side_effect=slow_search
+        ) as mock_run_search_query, patch.object(
+            self.job_aggregator,
+            "insert_jobs",
+            side_effect=sqlite3.OperationalError("disk I/O error"),
+        ):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.job_aggregator.run()
+        self.assertLess(mock_run_search_query.call_count, 20)
+
+    def test_prune_checkpoints(self):
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            names = ["checkpoint-20000101.json", "checkpoint-99991231.json", "a.log"]
+            for name in names:
+                open(os.path.join(checkpoint_dir, name), "w").close()
+            self.job_aggregator.checkpoint_path = os.path.join(
+                checkpoint_dir, "checkpoint-99991231.json"
+            )
+            self.job_aggregator.prune_checkpoints()
+            self.assertEqual(
+                sorted(os.listdir(checkpoint_dir)),
+                ["a.log", "checkpoint-99991231.json"],
+            )
 
-    def test_combine_results_success(self):
-        df1 = pd.DataFrame({"title": ["job1"]})
-        df2 = pd.DataFrame({"title": ["job2"]})
-        result = self.job_aggregator.combine_results([df1, df2])
-        self.assertEqual(len(result), 2)
+    def test_run_skips_checkpointed_queries(self):
+        self.job_aggregator.initialize_db()
+        self.run_with_frames(
+            {
+                "q1": [{"title": "Job A", "company": "Corp", "location": "NY"}],
+                "q2": [],
+            }
+        )
+        with patch.object(
+            self.job_aggregator, "run_search_query", return_value=[]
+        ) as mock_run_search_query:
+            self.job_aggregator.run()
+        mock_run_search_query.assert_called_once_with(make_query("q2"))
+
+    def test_run_checkpoints_parsed_queries(self):
+        self.job_aggregator.initialize_db()
+        queries = self.job_aggregator.parse_search_query_sequence()
+        with patch.object(
+            self.job_aggregator,
+            "run_search_query",
+            return_value=[{"title": "Job A", "company": "Corp", "location": "NY"}],
+        ):
+            self.job_aggregator.run()
+        self.assertEqual(
+            self.job_aggregator.load_checkpoint(),
+            {_query_key(search_query) for search_query in queries},
+        )
+
+    def test_query_key_matches_for_namedtuple_and_dataclass(self):
+        fields = ["site_name", "search_term", "google_search_term"]
+        fields += ["location", "country_indeed"]
+        legacy_query = namedtuple("scraper_query", fields)(
+            "indeed", "python", "python developer", "London", "GB"
+        )
+        query = ScraperQuery("indeed", "python", "python developer", "London", "GB")
+        self.assertEqual(_query_key(legacy_query), _query_key(query))
 
 
 if __name__ == "__main__":